@@ -3,7 +3,8 @@ Streamlit web interface for the Pakistani Law RAG application
 """
 import streamlit as st
 import os
-from rag_system import PakistaniLawRAG
+import re
+import html
 import logging
 
 # Configure logging
@@ -19,7 +20,7 @@ st.set_page_config(
 )
 
 # Custom CSS
-st.markdown("""
+CUSTOM_CSS = """
 <style>
     .main-header {
         font-size: 2.5rem;
@@ -62,18 +63,41 @@ st.markdown("""
         margin: 1rem 0;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+@st.cache_resource
+def get_minified_css():
+    """Collapse whitespace in the style block once per server process"""
+    return re.sub(r'\s+', ' ', CUSTOM_CSS).strip()
+
+# Streamlit drops elements that are not re-emitted on a rerun, so the style block must be
+# sent every run; send the minified copy to keep that message small
+st.markdown(get_minified_css(), unsafe_allow_html=True)
+
+@st.cache_resource
+def get_rag_system():
+    """Create the RAG system once per server process and share it across sessions"""
+    # Imported lazily so the page renders before Gemini/ChromaDB are loaded
+    from rag_system import PakistaniLawRAG
+    return PakistaniLawRAG()
+
+@st.cache_data(ttl=30)
+def get_cached_database_stats(_rag):
+    """Get database stats without re-querying ChromaDB on every rerun"""
+    return _rag.get_database_stats()
 
 def initialize_rag_system():
     """Initialize the RAG system"""
-    if 'rag_system' not in st.session_state:
-        try:
-            st.session_state.rag_system = PakistaniLawRAG()
-            return True
-        except Exception as e:
-            st.error(f"Failed to initialize RAG system: {str(e)}")
-            return False
-    return True
+    try:
+        get_rag_system()
+        return True
+    except Exception as e:
+        st.error(f"Failed to initialize RAG system: {str(e)}")
+        return False
+
+def set_example_query(example):
+    """Fill the question box with an example before the next rerun"""
+    st.session_state.query_input = example
 
 def display_answer(result):
     """Display the answer and sources in a formatted way"""
@@ -87,11 +111,20 @@ def display_answer(result):
     # Display sources
     if result.get('sources'):
         st.markdown('<div class="section-header">📚 Sources:</div>', unsafe_allow_html=True)
+        # Render all sources in one element instead of one expander per source
+        source_blocks = []
         for i, source in enumerate(result['sources'], 1):
-            with st.expander(f"Source {i}: {source['title']} (Similarity: {source['similarity_score']:.2f})"):
-                st.write(f"**Document Type:** {source['document_type']}")
-                st.write(f"**Section Number:** {source['section_number']}")
-                st.write(f"**Content Preview:** {source['content_preview']}")
+            label = f"Source {i}: {html.escape(str(source['title']))}"
+            if 'similarity_score' in source:
+                label += f" (Similarity: {source['similarity_score']:.2f})"
+            source_blocks.append(
+                f'<details class="source-box"><summary>{label}</summary>'
+                f'<strong>Document Type:</strong> {html.escape(str(source["document_type"]))}<br>'
+                f'<strong>Section Number:</strong> {html.escape(str(source["section_number"]))}<br>'
+                f'<strong>Content Preview:</strong> {html.escape(str(source["content_preview"]))}'
+                f'</details>'
+            )
+        st.markdown("".join(source_blocks), unsafe_allow_html=True)
 
 def main():
     """Main application function"""
@@ -100,9 +133,13 @@ def main():
     st.markdown("Ask questions about Pakistani laws, including the Pakistan Penal Code and Constitution!")
     
     # Initialize RAG system
-    if not initialize_rag_system():
+    with st.spinner("Loading RAG system..."):
+        initialized = initialize_rag_system()
+    if not initialized:
         st.stop()
     
+    rag = get_rag_system()
+    
     # Sidebar
     with st.sidebar:
         st.markdown("## 🔧 Settings")
@@ -110,7 +147,7 @@ def main():
         # Database status
         st.markdown("### Database Status")
         try:
-            stats = st.session_state.rag_system.get_database_stats()
+            stats = get_cached_database_stats(rag)
             if stats.get('total_documents', 0) > 0:
                 st.markdown(f'<div class="success-box">✅ Database loaded<br>Documents: {stats["total_documents"]}</div>', unsafe_allow_html=True)
             else:
@@ -139,14 +176,16 @@ def main():
         st.markdown("### Database Management")
         if st.button("🔄 Rebuild Database", help="Rebuild the entire database"):
             with st.spinner("Rebuilding database..."):
-                if st.session_state.rag_system.setup_database(force_rebuild=True):
+                if rag.setup_database(force_rebuild=True):
+                    get_cached_database_stats.clear()
                     st.success("Database rebuilt successfully!")
                     st.rerun()
                 else:
                     st.error("Failed to rebuild database")
         
         if st.button("🗑️ Reset Database", help="Reset the entire database"):
-            st.session_state.rag_system.reset_database()
+            rag.reset_database()
+            get_cached_database_stats.clear()
             st.success("Database reset successfully!")
             st.rerun()
     
@@ -159,6 +198,7 @@ def main():
         # Query input
         query = st.text_area(
             "Enter your question:",
+            key="query_input",
             placeholder="e.g., What is the punishment for murder? What are fundamental rights?",
             height=100
         )
@@ -171,7 +211,7 @@ def main():
                     doc_filter = None if doc_type == "All" else doc_type
                     
                     # Query the RAG system
-                    result = st.session_state.rag_system.query(
+                    result = rag.query(
                         query, 
                         n_results=n_results,
                         document_type=doc_filter
@@ -193,15 +233,8 @@ def main():
         ]
         
         for i, example in enumerate(example_questions):
-            if st.button(f"❓ {example}", key=f"example_{i}"):
-                st.session_state.example_query = example
-                st.rerun()
-        
-        # Handle example query
-        if 'example_query' in st.session_state:
-            query = st.session_state.example_query
-            del st.session_state.example_query
-            st.rerun()
+            # The click's own rerun picks up the new text; no extra st.rerun() needed
+            st.button(f"❓ {example}", key=f"example_{i}", on_click=set_example_query, args=(example,))
     
     with tab2:
         st.markdown('<div class="section-header">Search by Section Number</div>', unsafe_allow_html=True)
@@ -228,7 +261,7 @@ def main():
                     doc_filter = None if section_doc_type == "Any" else section_doc_type
                     
                     # Search for section
-                    result = st.session_state.rag_system.search_section(
+                    result = rag.search_section(
                         section_number.strip(),
                         document_type=doc_filter
                     )
@@ -262,7 +295,7 @@ def main():
         - **Vector Database**: ChromaDB
         - **Embeddings & LLM**: Google Gemini
         - **Web Interface**: Streamlit
-        - **Text Processing**: PyPDF2, pdfminer.six
+        - **Text Processing**: PyMuPDF, pdfminer.six, PyPDF2
         
         ### 📝 Usage Tips
         - Ask specific questions about legal concepts
@@ -274,7 +307,7 @@ def main():
         # System information
         st.markdown("### 📊 System Information")
         try:
-            stats = st.session_state.rag_system.get_database_stats()
+            stats = get_cached_database_stats(rag)
             st.json(stats)
         except:
             st.error("Unable to retrieve system information")
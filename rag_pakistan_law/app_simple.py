@@ -17,6 +17,16 @@ st.set_page_config(
     layout="wide"
 )
 
+@st.cache_resource
+def get_rag_system():
+    """Create the RAG system once per server process and share it across sessions"""
+    from rag_system import PakistaniLawRAG
+    return PakistaniLawRAG()
+
+def set_example_query(example):
+    """Fill the question box with an example before the next rerun"""
+    st.session_state.query_input = example
+
 def check_setup():
     """Check if the system is properly set up"""
     issues = []
@@ -65,13 +75,8 @@ def main():
     
     # Try to load the RAG system
     try:
-        from rag_system import PakistaniLawRAG
-        
-        if 'rag_system' not in st.session_state:
-            with st.spinner("Loading RAG system..."):
-                st.session_state.rag_system = PakistaniLawRAG()
-        
-        rag = st.session_state.rag_system
+        with st.spinner("Loading RAG system..."):
+            rag = get_rag_system()
         
         # Check database stats
         try:
@@ -94,6 +99,7 @@ def main():
         
         query = st.text_area(
             "Enter your question:",
+            key="query_input",
             placeholder="e.g., What is section 302? What are fundamental rights?",
             height=100
         )
@@ -131,15 +137,8 @@ def main():
         cols = st.columns(2)
         for i, example in enumerate(examples):
             with cols[i % 2]:
-                if st.button(f"❓ {example}", key=f"example_{i}"):
-                    st.session_state.example_query = example
-                    st.rerun()
-        
-        # Handle example query
-        if 'example_query' in st.session_state:
-            query = st.session_state.example_query
-            del st.session_state.example_query
-            st.rerun()
+                # The click's own rerun picks up the new text; no extra st.rerun() needed
+                st.button(f"❓ {example}", key=f"example_{i}", on_click=set_example_query, args=(example,))
     
     except Exception as e:
         st.error(f"❌ Error loading RAG system: {e}")
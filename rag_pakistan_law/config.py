@@ -6,21 +6,60 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Directory containing this package; caches written by the app are anchored here so they
+# don't depend on the working directory a script is started from
+PACKAGE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
 # API Configuration
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
 # ChromaDB Configuration
 CHROMA_PERSIST_DIRECTORY = "./chroma_db"
 COLLECTION_NAME = "pakistani_laws"
+# Number of collections chunks are spread over (by chunk id). More shards keep each HNSW
+# graph smaller and are searched in parallel; changing it requires rebuilding the database.
+COLLECTION_SHARDS = int(os.getenv("COLLECTION_SHARDS", "1"))
+CHROMA_ADD_BATCH_SIZE = 250  # Chunks per collection.add call
+CHROMA_WRITE_QUEUE_SIZE = 8  # Pending add_documents_async calls before producers block
+# HNSW index settings; ChromaDB fixes these when the collection is created, so changing
+# them only takes effect after the collection is reset and rebuilt
+HNSW_SPACE = "cosine"  # Makes similarity_score = 1 - distance the cosine similarity
+HNSW_CONSTRUCTION_EF = 200
+HNSW_M = 32
+HNSW_SEARCH_EF = 100
+HNSW_BATCH_SIZE = 1000  # Vectors buffered before they are inserted into the graph
+HNSW_SYNC_THRESHOLD = 10000  # Vectors added between writes of the index to disk
 
 # Text Processing Configuration
-CHUNK_SIZE = 1000
-CHUNK_OVERLAP = 200
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
+# "semantic" keeps sections whole and splits oversized ones at sentence boundaries;
+# "fixed" splits oversized sections into overlapping fixed-size token windows
+CHUNK_STRATEGY = os.getenv("CHUNK_STRATEGY", "semantic")
+TOKENIZER_THREADS = os.cpu_count() or 1  # Threads chunking sections in parallel (tiktoken runs outside the GIL)
 
 # Model Configuration
 EMBEDDING_MODEL = "models/embedding-001"
 GENERATION_MODEL = "gemini-1.5-flash"
+EMBEDDING_BATCH_SIZE = 100  # Maximum texts per Gemini embedding request
+EMBEDDING_MAX_RETRIES = 5
+EMBEDDING_BACKOFF_BASE = 1.0  # Seconds; doubled after each rate-limited attempt
+EMBEDDING_BACKOFF_MAX = 30.0
+EMBEDDING_MAX_WORKERS = 8  # Concurrent embedding requests in flight
+CONTEXT_TOKEN_BUDGET = 1500  # Approximate prompt tokens spent on retrieved documents
+CHARS_PER_TOKEN = 4
+
+# Opt-in: return the top document verbatim instead of calling the LLM when it matches this closely
+SKIP_LLM_ON_HIGH_SIM = os.getenv("SKIP_LLM_ON_HIGH_SIM", "false").lower() == "true"
+HIGH_SIMILARITY_THRESHOLD = 0.9
+
+# Cache Configuration
+QUERY_EMBEDDING_CACHE_SIZE = 2048
+QUERY_CACHE_PATH = os.path.join(PACKAGE_DIRECTORY, "query_cache.db")  # On-disk query embedding cache; set to None to disable
+SEARCH_RESULT_CACHE_SIZE = 1000
+SEARCH_RESULT_CACHE_TTL = 300  # Seconds a cached vector search result stays valid
 
 # File paths
 PDF_DIRECTORY = "./pdfs"
 PROCESSED_DIRECTORY = "./processed_texts"
+RAW_TEXT_CACHE_DIRECTORY = os.path.join(PACKAGE_DIRECTORY, "processed_texts", "_raw_cache")  # Extracted PDF text keyed by file mtime/size
@@ -2,6 +2,7 @@
 Script to help download Pakistani law PDFs
 """
 import os
+import shutil
 import requests
 from pathlib import Path
 import logging
@@ -9,6 +10,12 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Shared session so repeated downloads reuse pooled keep-alive connections
+SESSION = requests.Session()
+SESSION.headers.update({'User-Agent': 'rag-pakistan-law/1.0'})
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+
 def create_pdf_directory():
     """Create PDF directory if it doesn't exist"""
     pdf_dir = Path("pdfs")
@@ -18,14 +25,14 @@ def create_pdf_directory():
 def download_file(url, filename, pdf_dir):
     """Download a file from URL"""
     try:
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
-        
         file_path = pdf_dir / filename
         
-        with open(file_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+        with SESSION.get(url, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True  # Honour gzip/deflate transfer encoding
+            
+            with open(file_path, 'wb') as f:
+                shutil.copyfileobj(response.raw, f, length=DOWNLOAD_CHUNK_SIZE)
         
         logger.info(f"✅ Downloaded: {filename}")
         return True
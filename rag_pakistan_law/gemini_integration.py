@@ -1,91 +1,219 @@
 """
 Gemini API integration for embeddings and text generation
 """
+import time
+import sqlite3
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 import google.generativeai as genai
-from typing import List, Dict, Any
+from google.api_core.exceptions import InvalidArgument, ResourceExhausted
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
 import logging
-from config import GEMINI_API_KEY, EMBEDDING_MODEL, GENERATION_MODEL
+from config import (GEMINI_API_KEY, EMBEDDING_MODEL, GENERATION_MODEL, EMBEDDING_BATCH_SIZE,
+                    EMBEDDING_MAX_RETRIES, EMBEDDING_BACKOFF_BASE, EMBEDDING_BACKOFF_MAX, EMBEDDING_MAX_WORKERS, QUERY_EMBEDDING_CACHE_SIZE,
+                    CONTEXT_TOKEN_BUDGET, CHARS_PER_TOKEN, QUERY_CACHE_PATH)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Fixed instructions sent once as the model's system instruction rather than in every prompt
+SYSTEM_PROMPT = """You are a legal assistant specializing in Pakistani law. Answer the user's question based on the provided legal documents.
+
+Instructions:
+1. Provide a clear, accurate answer based on the legal documents provided
+2. If the answer is found in a specific section/article, mention the section number
+3. If the information is not available in the provided context, say so clearly
+4. Use simple language that a non-lawyer can understand
+5. If applicable, provide relevant details about punishments, procedures, or requirements"""
+
 class GeminiIntegration:
     """Handles Gemini API integration for embeddings and text generation"""
     
-    def __init__(self, api_key: str = GEMINI_API_KEY):
+    def __init__(self, api_key: str = GEMINI_API_KEY, warmup: bool = True,
+                 query_cache_path: Optional[str] = QUERY_CACHE_PATH):
         if not api_key:
             raise ValueError("Gemini API key is required")
         
         self.api_key = api_key
         genai.configure(api_key=api_key)
-        self.embedding_model = genai.GenerativeModel(EMBEDDING_MODEL)
-        self.generation_model = genai.GenerativeModel(GENERATION_MODEL)
+        self.generation_model = genai.GenerativeModel(GENERATION_MODEL, system_instruction=SYSTEM_PROMPT)
+        
+        # LRU cache of query embeddings keyed by normalized query text; one instance is shared
+        # by every Streamlit session, so all access goes through _query_cache_lock
+        self._query_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._query_cache_lock = threading.Lock()
+        self.query_cache_size = QUERY_EMBEDDING_CACHE_SIZE
+        
+        # Persistent cache so query embeddings survive process restarts
+        self._cache_db = None
+        self._cache_db_lock = threading.Lock()
+        if query_cache_path:
+            self._open_query_cache_db(query_cache_path)
+        
+        # Open the API connection in the background so the first query doesn't pay for it
+        if warmup:
+            threading.Thread(target=self._warmup, daemon=True).start()
         
         logger.info("Gemini integration initialized")
     
-    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for a list of texts"""
+    def _open_query_cache_db(self, path: str):
+        """Open (creating if needed) the SQLite query embedding cache"""
+        try:
+            self._cache_db = sqlite3.connect(path, check_same_thread=False)
+            self._cache_db.execute(
+                "CREATE TABLE IF NOT EXISTS query_cache ("
+                "model TEXT NOT NULL, query TEXT NOT NULL, embedding BLOB NOT NULL, "
+                "PRIMARY KEY (model, query))"
+            )
+            self._cache_db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Query embedding cache unavailable: {e}")
+            self._cache_db = None
+    
+    def _load_persisted_query(self, cache_key: str) -> Optional[List[float]]:
+        """Look up a query embedding in the on-disk cache"""
+        if self._cache_db is None:
+            return None
+        try:
+            with self._cache_db_lock:
+                row = self._cache_db.execute(
+                    "SELECT embedding FROM query_cache WHERE model = ? AND query = ?",
+                    (EMBEDDING_MODEL, cache_key)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to read query embedding cache: {e}")
+            return None
+        return np.frombuffer(row[0], dtype=np.float32).tolist() if row else None
+    
+    def _persist_query(self, cache_key: str, embedding: List[float]):
+        """Store a query embedding in the on-disk cache as float32 bytes"""
+        if self._cache_db is None:
+            return
+        try:
+            with self._cache_db_lock:
+                self._cache_db.execute(
+                    "INSERT OR REPLACE INTO query_cache (model, query, embedding) VALUES (?, ?, ?)",
+                    (EMBEDDING_MODEL, cache_key, np.asarray(embedding, dtype=np.float32).tobytes())
+                )
+                self._cache_db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to write query embedding cache: {e}")
+    
+    def _warmup(self):
+        """Issue a throwaway embedding request to establish the API connection"""
+        try:
+            genai.embed_content(model=EMBEDDING_MODEL, content="warmup", task_type="retrieval_query")
+        except Exception as e:
+            logger.debug(f"Embedding warmup failed: {e}")
+    
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        """Embed a batch of texts in a single API call, backing off only on rate limits
+        
+        Raises ResourceExhausted if the rate limit persists through EMBEDDING_MAX_RETRIES attempts.
+        """
+        for attempt in range(EMBEDDING_MAX_RETRIES):
+            try:
+                result = genai.embed_content(model=EMBEDDING_MODEL, content=batch,
+                                             task_type="retrieval_document")
+                return result['embedding']
+            except ResourceExhausted:
+                if attempt == EMBEDDING_MAX_RETRIES - 1:
+                    raise
+                delay = min(EMBEDDING_BACKOFF_BASE * 2 ** attempt, EMBEDDING_BACKOFF_MAX)
+                logger.warning(f"Embedding rate limit hit, retrying in {delay:.1f}s")
+                time.sleep(delay)
+    
+    def _embed_batch_or_skip(self, batch: List[str]) -> List[Optional[List[float]]]:
+        """Embed a batch, retrying texts individually when the batch is rejected as invalid
+        
+        Only InvalidArgument (a problem with some text in the batch) triggers the per-text
+        retry, with None returned for texts that are still rejected. A batch that stays rate
+        limited after all retries is returned as all None so its texts are skipped. Auth and
+        network errors are raised, since retrying each text would only repeat them.
+        """
+        try:
+            return self._embed_batch(batch)
+        except ResourceExhausted as e:
+            logger.warning(f"Skipping batch of {len(batch)} texts, rate limit persisted after retries: {e}")
+            return [None] * len(batch)
+        except InvalidArgument as e:
+            logger.warning(f"Failed to generate embeddings for batch, retrying texts individually: {e}")
+        
+        embeddings = []
+        for text in batch:
+            try:
+                embeddings.append(self._embed_batch([text])[0])
+            except (InvalidArgument, ResourceExhausted) as e:
+                logger.warning(f"Failed to generate embedding for text: {e}")
+                embeddings.append(None)
+        return embeddings
+    
+    def generate_embeddings(self, texts: List[str], batch_size: int = EMBEDDING_BATCH_SIZE,
+                            max_workers: int = EMBEDDING_MAX_WORKERS) -> np.ndarray:
+        """Generate embeddings for a list of texts
+        
+        Returns a float32 array of shape (len(texts), dim). Rows for texts that could not be
+        embedded (including whole batches that stayed rate limited) are NaN and should be
+        skipped rather than stored in the vector index. An empty array is returned if nothing
+        could be embedded or the API fails outright (bad key, network error).
+        """
         try:
-            embeddings = []
+            batch_starts = range(0, len(texts), batch_size)
+            batches = [texts[i:i + batch_size] for i in batch_starts]
             
-            # Process texts in batches to avoid rate limits
-            batch_size = 10
-            for i in range(0, len(texts), batch_size):
-                batch = texts[i:i + batch_size]
-                
-                for text in batch:
-                    try:
-                        # Generate embedding for single text
-                        result = self.embedding_model.embed_content(text)
-                        embedding = result['embedding']
-                        embeddings.append(embedding)
-                        
-                    except Exception as e:
-                        logger.warning(f"Failed to generate embedding for text: {e}")
-                        # Add zero vector as fallback
-                        embeddings.append([0.0] * 768)  # Standard embedding size
-                
-                # Small delay between batches
-                import time
-                time.sleep(0.1)
+            # Requests are I/O bound, so overlap them; results are read back in batch order
+            embeddings = None
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(self._embed_batch_or_skip, batch) for batch in batches]
+                try:
+                    for start, future in zip(batch_starts, futures):
+                        for offset, embedding in enumerate(future.result()):
+                            if embedding is None:
+                                continue
+                            if embeddings is None:
+                                embeddings = np.full((len(texts), len(embedding)), np.nan, dtype=np.float32)
+                            embeddings[start + offset] = embedding
+                except Exception:
+                    # Auth or network failure: don't wait for batches that would fail the same way
+                    for future in futures:
+                        future.cancel()
+                    raise
+            
+            if embeddings is None:
+                logger.error("Failed to generate any embeddings")
+                return np.empty((0, 0), dtype=np.float32)
             
-            logger.info(f"Generated {len(embeddings)} embeddings")
+            failed = int(np.isnan(embeddings[:, 0]).sum())
+            logger.info(f"Generated {len(embeddings) - failed} embeddings ({failed} failed)")
             return embeddings
             
         except Exception as e:
             logger.error(f"Failed to generate embeddings: {e}")
-            return []
+            return np.empty((0, 0), dtype=np.float32)
     
     def generate_answer(self, query: str, context_documents: List[Dict[str, Any]], 
                        max_tokens: int = 1000) -> str:
         """Generate answer using retrieved context documents"""
         try:
-            # Prepare context from retrieved documents
-            context_text = ""
-            for i, doc in enumerate(context_documents[:3]):  # Use top 3 documents
-                context_text += f"Document {i+1}:\n"
-                context_text += f"Section: {doc['metadata'].get('section_number', 'N/A')}\n"
-                context_text += f"Title: {doc['metadata'].get('title', 'N/A')}\n"
-                context_text += f"Content: {doc['content']}\n\n"
+            # Prepare context from retrieved documents, stopping once the token budget is spent
+            context_parts = []
+            budget = CONTEXT_TOKEN_BUDGET * CHARS_PER_TOKEN
+            used = 0
+            for i, doc in enumerate(context_documents[:3]):  # Use at most top 3 documents
+                doc_text = (f"Document {i+1}:\n"
+                            f"Section: {doc['metadata'].get('section_number', 'N/A')}\n"
+                            f"Title: {doc['metadata'].get('title', 'N/A')}\n"
+                            f"Content: {doc['content']}\n\n")
+                if context_parts and used + len(doc_text) > budget:
+                    break
+                context_parts.append(doc_text)
+                used += len(doc_text)
+            context_text = "".join(context_parts)
             
-            # Create prompt for Gemini
-            prompt = f"""
-You are a legal assistant specializing in Pakistani law. Answer the user's question based on the provided legal documents.
-
-Context Documents:
-{context_text}
-
-User Question: {query}
-
-Instructions:
-1. Provide a clear, accurate answer based on the legal documents provided
-2. If the answer is found in a specific section/article, mention the section number
-3. If the information is not available in the provided context, say so clearly
-4. Use simple language that a non-lawyer can understand
-5. If applicable, provide relevant details about punishments, procedures, or requirements
-
-Answer:
-"""
+            # Only the per-request parts are sent; instructions live in SYSTEM_PROMPT
+            prompt = f"Context Documents:\n{context_text}\nUser Question: {query}\n\nAnswer:"
             
             # Generate response
             response = self.generation_model.generate_content(prompt)
@@ -100,20 +228,52 @@ Answer:
             return f"Error generating response: {str(e)}"
     
     def generate_embedding_for_query(self, query: str) -> List[float]:
-        """Generate embedding for a user query"""
-        try:
-            result = self.embedding_model.embed_content(query)
-            return result['embedding']
-        except Exception as e:
-            logger.error(f"Failed to generate query embedding: {e}")
-            return []
+        """Generate embedding for a user query, reusing cached results for repeated queries"""
+        cache_key = query.strip().lower()
+        with self._query_cache_lock:
+            cached = self._query_cache.get(cache_key)
+            if cached is not None:
+                self._query_cache.move_to_end(cache_key)
+                return cached
+        
+        embedding = self._load_persisted_query(cache_key)
+        if embedding is None:
+            try:
+                result = genai.embed_content(model=EMBEDDING_MODEL, content=query,
+                                             task_type="retrieval_query")
+                embedding = result['embedding']
+            except Exception as e:
+                logger.error(f"Failed to generate query embedding: {e}")
+                return []
+            
+            if embedding:
+                self._persist_query(cache_key, embedding)
+        
+        if embedding:
+            with self._query_cache_lock:
+                self._query_cache[cache_key] = embedding
+                self._query_cache.move_to_end(cache_key)
+                if len(self._query_cache) > self.query_cache_size:
+                    self._query_cache.popitem(last=False)
+        
+        return embedding
+    
+    def clear_query_cache(self):
+        """Clear the in-memory and on-disk query embedding caches"""
+        with self._query_cache_lock:
+            self._query_cache.clear()
+        if self._cache_db is not None:
+            with self._cache_db_lock:
+                self._cache_db.execute("DELETE FROM query_cache")
+                self._cache_db.commit()
     
     def test_connection(self) -> bool:
         """Test the Gemini API connection"""
         try:
-            test_text = "Test connection"
-            embedding = self.generate_embedding_for_query(test_text)
-            return len(embedding) > 0
+            # Call the API directly; a cached query embedding would hide a bad key or no network
+            result = genai.embed_content(model=EMBEDDING_MODEL, content="Test connection",
+                                         task_type="retrieval_query")
+            return len(result['embedding']) > 0
         except Exception as e:
             logger.error(f"Gemini API connection test failed: {e}")
             return False
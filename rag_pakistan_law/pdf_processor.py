@@ -3,26 +3,98 @@ PDF processing module for extracting text from Pakistani law documents
 """
 import os
 import re
-from typing import List, Dict, Tuple
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from typing import List, Dict, Tuple, Optional, Iterator, Iterable
+import fitz  # PyMuPDF
+import pypdfium2 as pdfium
 import PyPDF2
 from pdfminer.high_level import extract_text
 from pdfminer.layout import LAParams
 import logging
+from config import RAW_TEXT_CACHE_DIRECTORY
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Patterns are compiled once at import rather than looked up on every call
+_WHITESPACE_RE = re.compile(r'\s+')
+_PAGE_NUMBER_RE = re.compile(r'\d+\s*')
+_PAGE_HEADER_RE = re.compile(r'Page\s+\d+\s+of\s+\d+')
+_KEPT_CHAR_RE = re.compile(r'[\w\s\.\,\;\:\!\?\(\)\[\]\{\}\-\'\"\/]')
+
+class _ArtifactTable(dict):
+    """str.translate table deleting every character outside _KEPT_CHAR_RE
+    
+    Entries are filled in the first time a code point is seen, so the table stays small
+    while still covering the Unicode letters that \\w keeps.
+    """
+    
+    def __missing__(self, codepoint: int) -> Optional[int]:
+        value = codepoint if _KEPT_CHAR_RE.match(chr(codepoint)) else None
+        self[codepoint] = value
+        return value
+
+_ARTIFACT_TABLE = _ArtifactTable()
+
+# Section/article headings; bodies are the text between consecutive headings. Keep these
+# free of lazy DOTALL groups and lookaheads so the stdlib engine scans in linear time.
+_SECTION_RE = re.compile(r'Section\s+(\d+[A-Z]?)\s*[:\-]?\s*', re.IGNORECASE)
+_ARTICLE_RE = re.compile(r'Article\s+(\d+[A-Z]?)\s*[:\-]?\s*', re.IGNORECASE)
+
+# Heading pattern and title label used for each document type; each document is
+# scanned once with the single pattern for its type
+_HEADING_PATTERNS = {
+    'penal_code': (_SECTION_RE, 'Section'),
+    'constitution': (_ARTICLE_RE, 'Article'),
+}
+
+def _split_at_headings(text: str, heading_re: "re.Pattern") -> Iterator[Tuple[str, str]]:
+    """Yield (number, body) pairs by slicing text between heading matches in a single linear scan"""
+    matches = list(heading_re.finditer(text))
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        yield match.group(1), text[match.end():end]
+
+def write_sections(sections: Iterable[Dict[str, str]], output_file: str) -> int:
+    """Write sections as line-delimited JSON, one section per line, returning the count written"""
+    count = 0
+    with open(output_file, 'w', encoding='utf-8') as f:
+        for section in sections:
+            f.write(json.dumps(section, ensure_ascii=False))
+            f.write('\n')
+            count += 1
+    return count
+
+def read_sections(input_file: str) -> List[Dict[str, str]]:
+    """Read sections written by write_sections"""
+    with open(input_file, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
 class PDFProcessor:
     """Handles PDF text extraction and preprocessing for Pakistani laws"""
     
-    def __init__(self, pdf_directory: str = "./pdfs"):
+    def __init__(self, pdf_directory: str = "./pdfs",
+                 cache_directory: Optional[str] = RAW_TEXT_CACHE_DIRECTORY):
         self.pdf_directory = pdf_directory
+        self.cache_directory = cache_directory
         self.processed_texts = []
         
     def extract_text_from_pdf(self, pdf_path: str) -> str:
         """Extract text from PDF using multiple methods for better accuracy"""
         try:
-            # Method 1: Try pdfminer first (better for complex layouts)
+            # Method 1: PyMuPDF (native MuPDF engine, much faster than the pure-Python parsers)
+            with fitz.open(pdf_path) as doc:
+                text = "\n".join(page.get_text("text") for page in doc)
+            if text.strip():
+                return text
+        except Exception as e:
+            logger.warning(f"PyMuPDF failed for {pdf_path}: {e}")
+        
+        try:
+            # Method 2: Fallback to pdfminer (better for complex layouts)
             text = extract_text(pdf_path, laparams=LAParams())
             if text.strip():
                 return text
@@ -30,68 +102,99 @@ class PDFProcessor:
             logger.warning(f"pdfminer failed for {pdf_path}: {e}")
         
         try:
-            # Method 2: Fallback to PyPDF2
+            # Method 3: Fallback to pypdfium2 (PDFium engine)
+            pdf = pdfium.PdfDocument(pdf_path)
+            try:
+                text = "\n".join(page.get_textpage().get_text_range() for page in pdf)
+            finally:
+                pdf.close()
+            if text.strip():
+                return text
+        except Exception as e:
+            logger.warning(f"pypdfium2 failed for {pdf_path}: {e}")
+        
+        try:
+            # Method 4: Last resort, PyPDF2
             with open(pdf_path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-                return text
+                # Join once instead of growing the string page by page
+                return "".join(page.extract_text() + "\n" for page in pdf_reader.pages)
         except Exception as e:
             logger.error(f"PyPDF2 also failed for {pdf_path}: {e}")
             return ""
     
+    def _raw_cache_path(self, pdf_path: str) -> Optional[str]:
+        """Cache file for a PDF's extracted text, keyed by name, modification time and size"""
+        if not self.cache_directory:
+            return None
+        stat = os.stat(pdf_path)
+        key = f"{os.path.basename(pdf_path)}.{stat.st_mtime_ns}.{stat.st_size}.txt"
+        return os.path.join(self.cache_directory, key)
+    
+    def extract_text_cached(self, pdf_path: str) -> str:
+        """Extract text from a PDF, reusing the cached extraction if the file is unchanged"""
+        cache_path = self._raw_cache_path(pdf_path)
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                return f.read()
+        
+        text = self.extract_text_from_pdf(pdf_path)
+        
+        if cache_path and text:
+            try:
+                os.makedirs(self.cache_directory, exist_ok=True)
+                tmp_path = cache_path + ".tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(text)
+                os.replace(tmp_path, cache_path)
+            except OSError as e:
+                logger.warning(f"Failed to cache extracted text for {pdf_path}: {e}")
+        
+        return text
+    
     def clean_text(self, text: str) -> str:
         """Clean and normalize extracted text"""
-        # Remove excessive whitespace
-        text = re.sub(r'\s+', ' ', text)
+        # Remove page headers/footers
+        text = _PAGE_HEADER_RE.sub('', text)
+        
+        # Remove common PDF artifacts with a C-level table lookup instead of a regex match per character
+        text = text.translate(_ARTIFACT_TABLE)
         
-        # Remove page numbers and headers/footers
-        text = re.sub(r'Page \d+ of \d+', '', text)
-        text = re.sub(r'^\d+\s*$', '', text, flags=re.MULTILINE)
+        # Remove excessive whitespace
+        text = _WHITESPACE_RE.sub(' ', text)
         
-        # Clean up common PDF artifacts
-        text = re.sub(r'[^\w\s\.\,\;\:\!\?\(\)\[\]\{\}\-\'\"\/]', '', text)
+        # Drop text that is nothing but a page number
+        if _PAGE_NUMBER_RE.fullmatch(text):
+            return ''
         
         return text.strip()
     
-    def extract_sections(self, text: str, document_type: str) -> List[Dict[str, str]]:
-        """Extract individual sections from the document"""
+    def extract_sections(self, text: str, document_type: str, cleaned: bool = False) -> List[Dict[str, str]]:
+        """Extract individual sections from the document
+        
+        Pass cleaned=True when text has already been through clean_text to skip re-cleaning
+        each section body.
+        """
         sections = []
+        clean = (lambda body: body) if cleaned else self.clean_text
         
-        if document_type.lower() == "penal_code":
-            # Pattern for Pakistan Penal Code sections
-            section_pattern = r'Section\s+(\d+[A-Z]?)\s*[:\-]?\s*(.*?)(?=Section\s+\d+[A-Z]?|$)'
-            matches = re.finditer(section_pattern, text, re.DOTALL | re.IGNORECASE)
-            
-            for match in matches:
-                section_num = match.group(1).strip()
-                section_text = match.group(2).strip()
-                
-                if section_text and len(section_text) > 50:  # Filter out very short sections
-                    sections.append({
-                        'section_number': section_num,
-                        'title': f"Section {section_num}",
-                        'content': self.clean_text(section_text),
-                        'document_type': 'penal_code'
-                    })
-        
-        elif document_type.lower() == "constitution":
-            # Pattern for Constitution articles
-            article_pattern = r'Article\s+(\d+[A-Z]?)\s*[:\-]?\s*(.*?)(?=Article\s+\d+[A-Z]?|$)'
-            matches = re.finditer(article_pattern, text, re.DOTALL | re.IGNORECASE)
+        document_type = document_type.lower()
+        heading = _HEADING_PATTERNS.get(document_type)
+        if heading is None:
+            return sections
+        
+        heading_re, heading_label = heading
+        for section_num, section_text in _split_at_headings(text, heading_re):
+            section_num = section_num.strip()
+            section_text = section_text.strip()
             
-            for match in matches:
-                article_num = match.group(1).strip()
-                article_text = match.group(2).strip()
-                
-                if article_text and len(article_text) > 50:
-                    sections.append({
-                        'section_number': article_num,
-                        'title': f"Article {article_num}",
-                        'content': self.clean_text(article_text),
-                        'document_type': 'constitution'
-                    })
+            if section_text and len(section_text) > 50:  # Filter out very short sections
+                sections.append({
+                    'section_number': section_num,
+                    'title': f"{heading_label} {section_num}",
+                    'content': clean(section_text),
+                    'document_type': document_type
+                })
         
         return sections
     
@@ -100,7 +203,7 @@ class PDFProcessor:
         logger.info(f"Processing {pdf_path} as {document_type}")
         
         # Extract text
-        raw_text = self.extract_text_from_pdf(pdf_path)
+        raw_text = self.extract_text_cached(pdf_path)
         if not raw_text:
             logger.error(f"Failed to extract text from {pdf_path}")
             return []
@@ -109,19 +212,14 @@ class PDFProcessor:
         cleaned_text = self.clean_text(raw_text)
         
         # Extract sections
-        sections = self.extract_sections(cleaned_text, document_type)
+        sections = self.extract_sections(cleaned_text, document_type, cleaned=True)
         
         logger.info(f"Extracted {len(sections)} sections from {pdf_path}")
         return sections
     
-    def process_all_pdfs(self) -> List[Dict[str, str]]:
-        """Process all PDFs in the directory"""
-        all_sections = []
-        
-        if not os.path.exists(self.pdf_directory):
-            logger.warning(f"PDF directory {self.pdf_directory} does not exist")
-            return all_sections
-        
+    def _list_pdfs(self) -> List[Tuple[str, str]]:
+        """List (pdf_path, document_type) pairs for the PDFs in the directory"""
+        pdf_jobs = []
         for filename in os.listdir(self.pdf_directory):
             if filename.lower().endswith('.pdf'):
                 pdf_path = os.path.join(self.pdf_directory, filename)
@@ -134,25 +232,50 @@ class PDFProcessor:
                 else:
                     doc_type = 'unknown'
                 
-                sections = self.process_pdf(pdf_path, doc_type)
-                all_sections.extend(sections)
+                pdf_jobs.append((pdf_path, doc_type))
+        return pdf_jobs
+    
+    def iter_all_sections(self, max_workers: Optional[int] = None) -> Iterator[Dict[str, str]]:
+        """Yield sections from every PDF in the directory, one worker process per file"""
+        if not os.path.exists(self.pdf_directory):
+            logger.warning(f"PDF directory {self.pdf_directory} does not exist")
+            return
+        
+        pdf_jobs = self._list_pdfs()
+        
+        # Extraction is CPU bound, so use processes rather than threads. Spawn them instead of
+        # forking: the caller may already run gRPC threads (GeminiIntegration's warmup), and
+        # forking a process with live gRPC threads can hang the child.
+        if len(pdf_jobs) > 1:
+            paths, doc_types = zip(*pdf_jobs)
+            with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(),
+                                     mp_context=multiprocessing.get_context("spawn")) as executor:
+                yield from chain.from_iterable(executor.map(self.process_pdf, paths, doc_types))
+        else:
+            for path, doc_type in pdf_jobs:
+                yield from self.process_pdf(path, doc_type)
+    
+    def process_all_pdfs(self, max_workers: Optional[int] = None) -> List[Dict[str, str]]:
+        """Process all PDFs in the directory"""
+        all_sections = list(self.iter_all_sections(max_workers))
         
         self.processed_texts = all_sections
         logger.info(f"Total sections processed: {len(all_sections)}")
         return all_sections
     
-    def save_processed_texts(self, output_file: str = "./processed_texts/sections.json"):
-        """Save processed sections to a file"""
-        import json
+    def save_processed_texts(self, output_file: str = "./processed_texts/sections.jsonl",
+                             sections: Optional[Iterable[Dict[str, str]]] = None):
+        """Save processed sections to a file
         
+        ``sections`` defaults to the result of the last process_all_pdfs call; pass
+        iter_all_sections() to stream sections to disk without holding them all in memory.
+        """
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
         
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(self.processed_texts, f, indent=2, ensure_ascii=False)
+        count = write_sections(self.processed_texts if sections is None else sections, output_file)
         
-        logger.info(f"Processed texts saved to {output_file}")
+        logger.info(f"{count} processed sections saved to {output_file}")
 
 if __name__ == "__main__":
     processor = PDFProcessor()
-    sections = processor.process_all_pdfs()
-    processor.save_processed_texts()
+    processor.save_processed_texts(sections=processor.iter_all_sections())
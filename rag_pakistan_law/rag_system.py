@@ -2,18 +2,22 @@
 Main RAG system that orchestrates all components
 """
 import os
-import json
+import re
+import numpy as np
 from typing import List, Dict, Any, Optional
 import logging
-from pdf_processor import PDFProcessor
+from pdf_processor import PDFProcessor, write_sections, read_sections
 from text_chunker import TextChunker
 from vector_store import VectorStore
 from gemini_integration import GeminiIntegration
-from config import PDF_DIRECTORY, PROCESSED_DIRECTORY
+from config import PDF_DIRECTORY, PROCESSED_DIRECTORY, SKIP_LLM_ON_HIGH_SIM, HIGH_SIMILARITY_THRESHOLD
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Questions that name a specific section/article can be answered by a metadata lookup
+SECTION_QUERY_PATTERN = re.compile(r'\b(?:section|article)\s+(\d+[A-Z]?)\b', re.IGNORECASE)
+
 class PakistaniLawRAG:
     """Main RAG system for Pakistani law documents"""
     
@@ -24,7 +28,7 @@ class PakistaniLawRAG:
         self.gemini = GeminiIntegration()
         
         # Check if data is already processed
-        self.processed_file = os.path.join(PROCESSED_DIRECTORY, "sections.json")
+        self.processed_file = os.path.join(PROCESSED_DIRECTORY, "sections.jsonl")
         
     def setup_database(self, force_rebuild: bool = False):
         """Set up the vector database with processed documents"""
@@ -46,30 +50,35 @@ class PakistaniLawRAG:
                 
                 # Save processed sections
                 os.makedirs(PROCESSED_DIRECTORY, exist_ok=True)
-                with open(self.processed_file, 'w', encoding='utf-8') as f:
-                    json.dump(sections, f, indent=2, ensure_ascii=False)
+                write_sections(sections, self.processed_file)
                 
                 logger.info(f"Processed {len(sections)} sections from PDFs")
             else:
                 # Load existing processed sections
-                with open(self.processed_file, 'r', encoding='utf-8') as f:
-                    sections = json.load(f)
+                sections = read_sections(self.processed_file)
                 logger.info(f"Loaded {len(sections)} existing sections")
             
             # Create chunks from sections
             logger.info("Creating text chunks...")
-            chunks = self.text_chunker.create_chunks(sections)
-            chunks_with_metadata = self.text_chunker.add_metadata(chunks)
+            chunks_with_metadata = self.text_chunker.build_chunks(sections)
             
             # Generate embeddings
             logger.info("Generating embeddings...")
             texts = [chunk['content'] for chunk in chunks_with_metadata]
             embeddings = self.gemini.generate_embeddings(texts)
             
-            if not embeddings:
+            if len(embeddings) == 0:
                 logger.error("Failed to generate embeddings")
                 return False
             
+            # Skip chunks whose embedding failed instead of indexing placeholder vectors
+            embedded_mask = ~np.isnan(embeddings).any(axis=1)
+            if not embedded_mask.all():
+                skipped_ids = [chunk['id'] for chunk, ok in zip(chunks_with_metadata, embedded_mask) if not ok]
+                logger.warning(f"Skipping {len(skipped_ids)} chunks without embeddings: {skipped_ids}")
+                chunks_with_metadata = [chunk for chunk, ok in zip(chunks_with_metadata, embedded_mask) if ok]
+                embeddings = embeddings[embedded_mask]
+            
             # Add to vector store
             logger.info("Adding documents to vector store...")
             self.vector_store.add_documents(chunks_with_metadata, embeddings)
@@ -85,6 +94,14 @@ class PakistaniLawRAG:
               document_type: Optional[str] = None) -> Dict[str, Any]:
         """Query the RAG system with a question"""
         try:
+            # Look up section-number questions directly, skipping embedding and vector search
+            section_match = SECTION_QUERY_PATTERN.search(question)
+            if section_match:
+                result = self.search_section(section_match.group(1).upper(), document_type)
+                if not result.get('error'):
+                    result['query'] = question
+                    return result
+            
             # Generate embedding for the question
             query_embedding = self.gemini.generate_embedding_for_query(question)
             if not query_embedding:
@@ -112,8 +129,12 @@ class PakistaniLawRAG:
                     'error': 'No relevant documents found'
                 }
             
-            # Generate answer using retrieved context
-            answer = self.gemini.generate_answer(question, similar_docs)
+            # Generate answer using retrieved context, unless the top match can be returned as-is
+            top_doc = similar_docs[0]
+            if SKIP_LLM_ON_HIGH_SIM and top_doc['similarity_score'] >= HIGH_SIMILARITY_THRESHOLD:
+                answer = f"Here is the content of {top_doc['metadata'].get('title', 'the matching section')}:\n\n{top_doc['content']}"
+            else:
+                answer = self.gemini.generate_answer(question, similar_docs)
             
             # Prepare sources
             sources = []
@@ -168,6 +189,7 @@ class PakistaniLawRAG:
                     'section_number': result['metadata'].get('section_number', 'N/A'),
                     'title': result['metadata'].get('title', 'N/A'),
                     'document_type': result['metadata'].get('document_type', 'N/A'),
+                    'similarity_score': 1.0,  # Exact section match, so sources have the same shape as query()'s
                     'content_preview': result['content'][:200] + "..." if len(result['content']) > 200 else result['content']
                 }
                 sources.append(source)
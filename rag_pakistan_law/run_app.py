@@ -30,7 +30,8 @@ def check_requirements():
     
     # Check if PDFs exist
     pdf_dir = Path("pdfs")
-    if not pdf_dir.exists() or not list(pdf_dir.glob("*.pdf")):
+    # Stop scanning the directory at the first PDF instead of listing all of them
+    if not pdf_dir.exists() or next(pdf_dir.glob("*.pdf"), None) is None:
         print("⚠️  No PDF files found in pdfs/ directory")
         print("   Please download PDFs and run: python download_pdfs.py")
         return False
@@ -2,178 +2,256 @@
 Text chunking module for preparing text for vector embeddings
 """
 import re
-from typing import List, Dict
-import tiktoken
-from config import CHUNK_SIZE, CHUNK_OVERLAP
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from typing import List, Dict, Optional, Iterator
+import numpy as np
+from config import CHUNK_SIZE, CHUNK_OVERLAP, CHUNK_STRATEGY, TOKENIZER_THREADS
+
+# Common legal terms and important words
+LEGAL_TERMS = [
+    'punishment', 'offence', 'penalty', 'fine', 'imprisonment', 'death',
+    'murder', 'theft', 'fraud', 'assault', 'defamation', 'perjury',
+    'constitution', 'fundamental', 'rights', 'duties', 'citizen',
+    'government', 'parliament', 'judiciary', 'executive'
+]
+
+# Patterns are compiled once at import rather than looked up on every call
+_SENTENCE_END_RE = re.compile(r'[.!?]+')
+_NUMBER_RE = re.compile(r'\b\d+[A-Z]?\b')
+# One scan for every legal term; the lookahead reports overlapping matches too, so this
+# finds exactly the terms a substring test would
+_LEGAL_TERMS_RE = re.compile('(?=(' + '|'.join(map(re.escape, LEGAL_TERMS)) + '))')
+
+def _any_word_re(words: List[str]) -> "re.Pattern":
+    """Compile a pattern matching any of the words as a substring"""
+    return re.compile('|'.join(map(re.escape, words)))
+
+# Legal context rules per document type: (pattern, context) pairs tried in order, then
+# the fallback context. Each pattern is one scan instead of one substring scan per word.
+_LEGAL_CONTEXT_RULES = {
+    'penal_code': ([
+        (_any_word_re(['murder', 'death', 'kill']), 'criminal_law_homicide'),
+        (_any_word_re(['theft', 'steal', 'robbery']), 'criminal_law_property'),
+        (_any_word_re(['assault', 'hurt', 'injury']), 'criminal_law_violence'),
+    ], 'criminal_law_general'),
+    'constitution': ([
+        (_any_word_re(['fundamental', 'rights', 'freedom']), 'constitutional_rights'),
+        (_any_word_re(['government', 'parliament', 'executive']), 'constitutional_government'),
+        (_any_word_re(['judiciary', 'court', 'judge']), 'constitutional_judiciary'),
+    ], 'constitutional_general'),
+}
+
+def _get_encoding(name: str = "cl100k_base"):
+    """Return the tiktoken encoding; tiktoken caches it per process"""
+    # Imported lazily so importing this module does not load the tokenizer extension
+    import tiktoken
+    return tiktoken.get_encoding(name)
 
 class TextChunker:
     """Handles text chunking for optimal embedding generation"""
     
-    def __init__(self, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP):
+    def __init__(self, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP,
+                 strategy: str = CHUNK_STRATEGY):
+        if strategy not in ("semantic", "fixed"):
+            raise ValueError(f"Unknown chunk strategy: {strategy}")
+        if not 0 <= chunk_overlap < chunk_size:
+            raise ValueError(f"Chunk overlap must be at least 0 and less than the chunk size "
+                             f"(got overlap={chunk_overlap}, size={chunk_size})")
+        
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-        self.encoding = tiktoken.get_encoding("cl100k_base")
+        self.strategy = strategy
+        self.encoding = _get_encoding()
     
     def count_tokens(self, text: str) -> int:
         """Count tokens in text using tiktoken"""
         return len(self.encoding.encode(text))
     
+    def fits_in_chunk(self, text: str) -> bool:
+        """Check whether text fits in one chunk, skipping the tokenizer when possible
+        
+        Every cl100k_base token covers at least one UTF-8 byte, so text with no more bytes
+        than chunk_size always fits; only longer text needs an exact count.
+        """
+        if len(text) <= self.chunk_size and len(text.encode('utf-8')) <= self.chunk_size:
+            return True
+        return self.count_tokens(text) <= self.chunk_size
+    
     def split_text_by_tokens(self, text: str) -> List[str]:
         """Split text into chunks based on token count"""
-        tokens = self.encoding.encode(text)
+        # Hold the token ids in a compact int32 buffer; windows are views converted to
+        # lists only when decoded
+        tokens = np.asarray(self.encoding.encode(text), dtype=np.int32)
         chunks = []
         
         start = 0
         while start < len(tokens):
             end = min(start + self.chunk_size, len(tokens))
-            chunk_tokens = tokens[start:end]
-            chunk_text = self.encoding.decode(chunk_tokens)
+            chunk_text = self.encoding.decode(tokens[start:end].tolist())
             chunks.append(chunk_text)
             
-            # Move start position with overlap
-            start = end - self.chunk_overlap
-            if start >= len(tokens):
+            # The last window reaches the end of the text; stepping back by the overlap
+            # from there would repeat it forever
+            if end >= len(tokens):
                 break
+            
+            # Move start position with overlap, always advancing by at least one token
+            start = max(end - self.chunk_overlap, start + 1)
         
         return chunks
     
     def split_text_by_sentences(self, text: str) -> List[str]:
         """Split text into chunks by sentences for better semantic coherence"""
         # Split by sentences (period, exclamation, question mark)
-        sentences = re.split(r'[.!?]+', text)
+        sentences = _SENTENCE_END_RE.split(text)
         sentences = [s.strip() for s in sentences if s.strip()]
         
-        chunks = []
-        current_chunk = ""
+        # Tokenize each sentence once instead of re-encoding the growing chunk for every
+        # sentence. Encode serially: this already runs on _iter_chunks' section pool, and
+        # encode_ordinary_batch would start a thread pool per call.
+        sentence_token_ids = [self.encoding.encode_ordinary(sentence) for sentence in sentences]
         
-        for sentence in sentences:
-            # Check if adding this sentence would exceed chunk size
-            test_chunk = current_chunk + " " + sentence if current_chunk else sentence
-            
-            if self.count_tokens(test_chunk) <= self.chunk_size:
-                current_chunk = test_chunk
-            else:
-                # Save current chunk and start new one
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                current_chunk = sentence
-        
-        # Add the last chunk
-        if current_chunk:
-            chunks.append(current_chunk.strip())
+        # Prefix sums of sentence tokens plus one for each joining space: sentences i..j-1
+        # joined cost cum[j] - cum[i] - 1 tokens, so each chunk's end is one binary search
+        cum = np.zeros(len(sentences) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter((len(t) + 1 for t in sentence_token_ids), dtype=np.int64,
+                              count=len(sentences)), out=cum[1:])
+        
+        chunks = []
+        start = 0
+        while start < len(sentences):
+            end = int(np.searchsorted(cum, cum[start] + self.chunk_size + 1, side='right')) - 1
+            # A sentence longer than chunk_size still forms a chunk of its own
+            end = max(end, start + 1)
+            chunks.append(" ".join(sentences[start:end]))
+            start = end
         
         return chunks
     
-    def create_chunks(self, sections: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    def _section_chunks(self, section: Dict[str, str]) -> List[Dict[str, str]]:
+        """Split one processed section into chunk dicts"""
+        content = section['content']
+        
+        # If content is small enough, use as single chunk
+        if self.fits_in_chunk(content):
+            return [{
+                'id': f"{section['document_type']}_{section['section_number']}_0",
+                'section_number': section['section_number'],
+                'title': section['title'],
+                'content': content,
+                'document_type': section['document_type'],
+                'chunk_index': 0,
+                'total_chunks': 1
+            }]
+        
+        # Split into multiple chunks
+        if self.strategy == "fixed":
+            chunks = self.split_text_by_tokens(content)
+        else:
+            chunks = self.split_text_by_sentences(content)
+        
+        return [
+            {
+                'id': f"{section['document_type']}_{section['section_number']}_{i}",
+                'section_number': section['section_number'],
+                'title': f"{section['title']} (Part {i+1})",
+                'content': chunk_text,
+                'document_type': section['document_type'],
+                'chunk_index': i,
+                'total_chunks': len(chunks)
+            }
+            for i, chunk_text in enumerate(chunks)
+        ]
+    
+    def _iter_chunks(self, sections: List[Dict[str, str]],
+                     max_workers: Optional[int] = None) -> Iterator[Dict[str, str]]:
+        """Yield chunks for every section in order, splitting sections on a thread pool"""
+        # tiktoken encodes outside the GIL, so threads split sections in parallel
+        if len(sections) > 1:
+            with ThreadPoolExecutor(max_workers=max_workers or TOKENIZER_THREADS) as executor:
+                yield from chain.from_iterable(executor.map(self._section_chunks, sections))
+        else:
+            for section in sections:
+                yield from self._section_chunks(section)
+    
+    def create_chunks(self, sections: List[Dict[str, str]],
+                      max_workers: Optional[int] = None) -> List[Dict[str, str]]:
         """Create chunks from processed sections"""
-        all_chunks = []
+        return list(self._iter_chunks(sections, max_workers))
+    
+    def _add_chunk_metadata(self, chunk: Dict[str, str]) -> None:
+        """Fill in keywords and legal context, lowercasing the content only once"""
+        content = chunk['content']
+        content_lower = content.lower()
         
-        for section in sections:
-            content = section['content']
-            
-            # If content is small enough, use as single chunk
-            if self.count_tokens(content) <= self.chunk_size:
-                chunk = {
-                    'id': f"{section['document_type']}_{section['section_number']}_0",
-                    'section_number': section['section_number'],
-                    'title': section['title'],
-                    'content': content,
-                    'document_type': section['document_type'],
-                    'chunk_index': 0,
-                    'total_chunks': 1
-                }
-                all_chunks.append(chunk)
-            else:
-                # Split into multiple chunks
-                chunks = self.split_text_by_sentences(content)
-                
-                for i, chunk_text in enumerate(chunks):
-                    chunk = {
-                        'id': f"{section['document_type']}_{section['section_number']}_{i}",
-                        'section_number': section['section_number'],
-                        'title': f"{section['title']} (Part {i+1})",
-                        'content': chunk_text,
-                        'document_type': section['document_type'],
-                        'chunk_index': i,
-                        'total_chunks': len(chunks)
-                    }
-                    all_chunks.append(chunk)
+        # Add searchable keywords
+        chunk['keywords'] = self.extract_keywords(content, content_lower)
         
-        return all_chunks
+        # Add legal context
+        chunk['legal_context'] = self.determine_legal_context(chunk, content_lower)
     
     def add_metadata(self, chunks: List[Dict[str, str]]) -> List[Dict[str, str]]:
         """Add additional metadata to chunks for better retrieval"""
         for chunk in chunks:
-            # Add searchable keywords
-            keywords = self.extract_keywords(chunk['content'])
-            chunk['keywords'] = keywords
-            
-            # Add content summary
-            chunk['summary'] = self.create_summary(chunk['content'])
-            
-            # Add legal context
-            chunk['legal_context'] = self.determine_legal_context(chunk)
-        
+            self._add_chunk_metadata(chunk)
         return chunks
     
-    def extract_keywords(self, text: str) -> List[str]:
-        """Extract important keywords from text"""
-        # Common legal terms and important words
-        legal_terms = [
-            'punishment', 'offence', 'penalty', 'fine', 'imprisonment', 'death',
-            'murder', 'theft', 'fraud', 'assault', 'defamation', 'perjury',
-            'constitution', 'fundamental', 'rights', 'duties', 'citizen',
-            'government', 'parliament', 'judiciary', 'executive'
-        ]
+    def build_chunks(self, sections: List[Dict[str, str]],
+                     max_workers: Optional[int] = None) -> List[Dict[str, str]]:
+        """Create chunks with metadata in one pass; same result as create_chunks then add_metadata
         
-        # Convert to lowercase for matching
-        text_lower = text.lower()
-        found_keywords = []
+        Each chunk's metadata is filled in right after the chunk is split off, while its
+        content is still hot, instead of in a second walk over every chunk.
+        """
+        all_chunks = []
+        for chunk in self._iter_chunks(sections, max_workers):
+            self._add_chunk_metadata(chunk)
+            all_chunks.append(chunk)
+        return all_chunks
+    
+    def extract_keywords(self, text: str, text_lower: Optional[str] = None) -> List[str]:
+        """Extract important keywords from text
         
-        for term in legal_terms:
-            if term in text_lower:
-                found_keywords.append(term)
+        Pass text_lower when the caller already has text.lower() to skip recomputing it.
+        """
+        # Convert to lowercase for matching
+        if text_lower is None:
+            text_lower = text.lower()
+        found_keywords = set(_LEGAL_TERMS_RE.findall(text_lower))
         
         # Also extract section/article numbers mentioned
-        numbers = re.findall(r'\b\d+[A-Z]?\b', text)
-        found_keywords.extend(numbers)
+        found_keywords.update(_NUMBER_RE.findall(text))
         
-        return list(set(found_keywords))
+        return list(found_keywords)
     
     def create_summary(self, text: str) -> str:
-        """Create a brief summary of the chunk content"""
+        """Create a brief summary of the chunk content
+        
+        Summaries are not stored on chunks since they only repeat the start of the content;
+        call this when one is needed for display.
+        """
         # Take first 200 characters as summary
         summary = text[:200].strip()
         if len(text) > 200:
             summary += "..."
         return summary
     
-    def determine_legal_context(self, chunk: Dict[str, str]) -> str:
-        """Determine the legal context of the chunk"""
-        content = chunk['content'].lower()
-        doc_type = chunk['document_type']
-        
-        if doc_type == 'penal_code':
-            if any(word in content for word in ['murder', 'death', 'kill']):
-                return 'criminal_law_homicide'
-            elif any(word in content for word in ['theft', 'steal', 'robbery']):
-                return 'criminal_law_property'
-            elif any(word in content for word in ['assault', 'hurt', 'injury']):
-                return 'criminal_law_violence'
-            else:
-                return 'criminal_law_general'
-        
-        elif doc_type == 'constitution':
-            if any(word in content for word in ['fundamental', 'rights', 'freedom']):
-                return 'constitutional_rights'
-            elif any(word in content for word in ['government', 'parliament', 'executive']):
-                return 'constitutional_government'
-            elif any(word in content for word in ['judiciary', 'court', 'judge']):
-                return 'constitutional_judiciary'
-            else:
-                return 'constitutional_general'
-        
-        return 'general_legal'
+    def determine_legal_context(self, chunk: Dict[str, str], content_lower: Optional[str] = None) -> str:
+        """Determine the legal context of the chunk
+        
+        Pass content_lower when the caller already has the lowercased content.
+        """
+        rules = _LEGAL_CONTEXT_RULES.get(chunk['document_type'])
+        if rules is None:
+            return 'general_legal'
+        
+        content = chunk['content'].lower() if content_lower is None else content_lower
+        patterns, default_context = rules
+        for pattern, context in patterns:
+            if pattern.search(content):
+                return context
+        return default_context
 
 if __name__ == "__main__":
     # Test the chunker
@@ -187,8 +265,7 @@ if __name__ == "__main__":
         'document_type': 'penal_code'
     }
     
-    chunks = chunker.create_chunks([sample_section])
-    chunks_with_metadata = chunker.add_metadata(chunks)
+    chunks_with_metadata = chunker.build_chunks([sample_section])
     
     print("Sample chunk:")
     print(chunks_with_metadata[0])
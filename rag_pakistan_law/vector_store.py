@@ -2,26 +2,258 @@
 Vector store module using ChromaDB for storing and retrieving legal document embeddings
 """
 import os
+import json
+import time
+import heapq
+import queue
+import threading
+import zlib
+from functools import lru_cache
+import numpy as np
 import chromadb
 from chromadb.config import Settings
-from typing import List, Dict, Any, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from operator import itemgetter
+from typing import List, Dict, Any, Optional, Union, Tuple
 import logging
-from config import CHROMA_PERSIST_DIRECTORY, COLLECTION_NAME
+from config import (CHROMA_PERSIST_DIRECTORY, COLLECTION_NAME, COLLECTION_SHARDS, CHROMA_ADD_BATCH_SIZE, CHROMA_WRITE_QUEUE_SIZE,
+                    SEARCH_RESULT_CACHE_SIZE, SEARCH_RESULT_CACHE_TTL, HNSW_SPACE, HNSW_CONSTRUCTION_EF,
+                    HNSW_M, HNSW_SEARCH_EF, HNSW_BATCH_SIZE, HNSW_SYNC_THRESHOLD)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# SQLite settings for ChromaDB's backing database. WAL with synchronous=NORMAL stays
+# crash-safe for the database file but only fsyncs at checkpoints.
+_SQLITE_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "temp_store=MEMORY",
+    "cache_size=-262144",  # 256 MiB page cache
+    "mmap_size=30000000000",
+)
+# Bulk ingestion skips fsync entirely: a power loss mid-load can corrupt the database,
+# which is acceptable when it can be rebuilt from the PDFs
+_BULK_INGEST_PRAGMAS = ("synchronous=OFF",)
+
+# Metadata keys searches may filter on inside ChromaDB. embedding_metadata is indexed on
+# (key, string_value), so equality filters on these are index lookups; other keys are
+# applied to an oversampled result set instead of widening the where clause.
+_INDEXED_METADATA_KEYS = frozenset({'document_type', 'legal_context', 'section_number'})
+_COLLECTION_METADATA = {
+    "description": "Pakistani Law Documents",
+    "hnsw:space": HNSW_SPACE,
+    "hnsw:construction_ef": HNSW_CONSTRUCTION_EF,
+    "hnsw:M": HNSW_M,
+    "hnsw:search_ef": HNSW_SEARCH_EF,
+    "hnsw:batch_size": HNSW_BATCH_SIZE,
+    "hnsw:sync_threshold": HNSW_SYNC_THRESHOLD,
+}
+
+# Newer ChromaDB schemas already index (key, string_value) themselves (migration
+# 00004-metadata-indices); ours is only created when no such index exists
+_METADATA_INDEX_NAME = "embedding_metadata_key_string_value"
+_METADATA_INDEX_SQL = (f"CREATE INDEX IF NOT EXISTS {_METADATA_INDEX_NAME} "
+                       "ON embedding_metadata (key, string_value)")
+
+@lru_cache(maxsize=None)
+def _warn_unindexed_keys(keys: Tuple[str, ...]):
+    """Warn once per set of unindexed filter keys rather than on every search"""
+    logger.warning(f"Filtering on unindexed metadata keys {list(keys)} after the search")
+
 class VectorStore:
-    """Manages vector storage and retrieval using ChromaDB"""
+    """Manages vector storage and retrieval using ChromaDB
+    
+    Searches, section lookups and stats may be called from many threads at once. Writes
+    (add_documents, delete_collection) are serialized on one lock, since ChromaDB's SQLite
+    backend allows a single writer anyway and concurrent adds only contend for it.
+    """
     
-    def __init__(self, persist_directory: str = CHROMA_PERSIST_DIRECTORY):
+    def __init__(self, persist_directory: str = CHROMA_PERSIST_DIRECTORY, bulk_ingest: bool = False):
+        """Open the store; bulk_ingest=True trades durability for faster writes (see _BULK_INGEST_PRAGMAS)"""
         self.persist_directory = persist_directory
+        self.bulk_ingest = bulk_ingest
         self.client = None
-        self.collection = None
+        self.num_shards = max(1, COLLECTION_SHARDS)
+        self.collections = []
+        self._shard_pool = ThreadPoolExecutor(max_workers=self.num_shards) if self.num_shards > 1 else None
+        
+        # LRU cache of search results keyed by query vector, n_results and filter; entries
+        # expire after SEARCH_RESULT_CACHE_TTL and the cache is cleared whenever we write.
+        # Clearing bumps the version, so a search that started before a write doesn't
+        # store its (possibly stale) results afterwards.
+        self._search_cache: "OrderedDict[Tuple[bytes, int, str], Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._search_cache_lock = threading.Lock()
+        self._search_cache_version = 0
+        self.search_cache_size = SEARCH_RESULT_CACHE_SIZE
+        self.search_cache_ttl = SEARCH_RESULT_CACHE_TTL
+        self._search_cache_hits = 0
+        self._search_cache_misses = 0
+        
+        # Background writer for add_documents_async, started on first use
+        self._write_queue: "queue.Queue[Tuple[List[Dict[str, str]], Any]]" = queue.Queue(maxsize=CHROMA_WRITE_QUEUE_SIZE)
+        self._writer_thread = None
+        self._writer_lock = threading.Lock()
+        self._write_error: Optional[Exception] = None
+        self._write_lock = threading.Lock()
+        
         self._initialize_client()
     
+    def _shard_names(self) -> List[str]:
+        """Collection names of all shards; a single shard keeps the plain COLLECTION_NAME"""
+        if self.num_shards == 1:
+            return [COLLECTION_NAME]
+        return [f"{COLLECTION_NAME}_{shard}" for shard in range(self.num_shards)]
+    
+    def _shard_for(self, chunk_id: str) -> int:
+        """Shard a chunk id belongs to (crc32, since str hash() changes between processes)"""
+        return zlib.crc32(chunk_id.encode('utf-8')) % self.num_shards
+    
+    def _map_shards(self, fn) -> List[Any]:
+        """Call fn on every shard collection, in parallel when there are several"""
+        if self._shard_pool is None:
+            return [fn(collection) for collection in self.collections]
+        return list(self._shard_pool.map(fn, self.collections))
+    
+    def _sqlite_connection(self):
+        """The calling thread's connection to ChromaDB's SQLite database (ChromaDB internals)"""
+        from chromadb.db.impl.sqlite import SqliteDB
+        return self.client._system.instance(SqliteDB)._conn_pool.connect()
+    
+    def _tune_sqlite(self):
+        """Apply the SQLite pragmas to the calling thread's ChromaDB connection
+        
+        ChromaDB keeps one SQLite connection per thread and most pragmas are per connection,
+        so this runs at startup and again before writes. It reaches into ChromaDB internals,
+        so any failure only logs a warning.
+        """
+        pragmas = _SQLITE_PRAGMAS + (_BULK_INGEST_PRAGMAS if self.bulk_ingest else ())
+        try:
+            conn = self._sqlite_connection()
+            for pragma in pragmas:
+                conn.execute(f"PRAGMA {pragma}")
+        except Exception as e:
+            logger.warning(f"Could not tune ChromaDB SQLite settings: {e}")
+    
+    def _ensure_metadata_index(self):
+        """Index embedding_metadata so where filters on metadata values avoid a table scan
+        
+        Skipped when ChromaDB's schema already has a (key, string_value) index; an index of
+        ours left from an older schema is dropped then, so inserts don't maintain two.
+        """
+        try:
+            conn = self._sqlite_connection()
+            native_index = any(
+                name != _METADATA_INDEX_NAME and
+                [column[2] for column in conn.execute(f"PRAGMA index_info('{name}')")][:2] == ['key', 'string_value']
+                for _, name, *_ in conn.execute("PRAGMA index_list('embedding_metadata')")
+            )
+            if native_index:
+                conn.execute(f"DROP INDEX IF EXISTS {_METADATA_INDEX_NAME}")
+            else:
+                conn.execute(_METADATA_INDEX_SQL)
+        except Exception as e:
+            logger.warning(f"Could not create ChromaDB metadata index: {e}")
+    
+    @staticmethod
+    def _plan_filter(filter_metadata: Optional[Dict[str, Any]]) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+        """Split a metadata filter into a ChromaDB where clause and a post-filter
+        
+        Plain equality filters on _INDEXED_METADATA_KEYS go into the where clause (joined
+        with $and when there are several); equality filters on other keys are returned as
+        the post-filter. Filters using ChromaDB operators are passed through unchanged.
+        """
+        if not filter_metadata:
+            return None, {}
+        if any(key.startswith('$') or isinstance(value, (dict, list)) for key, value in filter_metadata.items()):
+            return filter_metadata, {}
+        
+        indexed = [{key: value} for key, value in filter_metadata.items() if key in _INDEXED_METADATA_KEYS]
+        post_filter = {key: value for key, value in filter_metadata.items() if key not in _INDEXED_METADATA_KEYS}
+        if post_filter:
+            _warn_unindexed_keys(tuple(sorted(post_filter)))
+        
+        if not indexed:
+            where = None
+        elif len(indexed) == 1:
+            where = indexed[0]
+        else:
+            where = {'$and': indexed}
+        return where, post_filter
+    
+    @staticmethod
+    def _query_size(n_results: int, post_filter: Dict[str, Any]) -> int:
+        """How many hits to request so enough survive the post-filter"""
+        return max(n_results * 3, 20) if post_filter else n_results
+    
+    @staticmethod
+    def _apply_post_filter(results: List[Dict[str, Any]], post_filter: Dict[str, Any],
+                           n_results: int) -> List[Dict[str, Any]]:
+        """Keep the best n_results hits whose metadata matches every post-filter value"""
+        if post_filter:
+            results = [
+                result for result in results
+                if all(result['metadata'].get(key) == value for key, value in post_filter.items())
+            ]
+        return results[:n_results]
+    
+    def _search_cache_key(self, query_vector: np.ndarray, n_results: int,
+                          filter_metadata: Optional[Dict[str, Any]]) -> Tuple[bytes, int, str]:
+        """Cache key for a search: the float32 query vector's bytes plus the search options"""
+        return (query_vector.tobytes(), n_results, json.dumps(filter_metadata, sort_keys=True))
+    
+    def _get_cached_search(self, key: Tuple[bytes, int, str]) -> Optional[List[Dict[str, Any]]]:
+        """Return unexpired cached results for a search, or None"""
+        with self._search_cache_lock:
+            entry = self._search_cache.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.search_cache_ttl:
+                self._search_cache.move_to_end(key)
+                self._search_cache_hits += 1
+                return self._copy_hits(entry[1])
+            if entry is not None:
+                del self._search_cache[key]
+            self._search_cache_misses += 1
+            return None
+    
+    def _cache_search(self, key: Tuple[bytes, int, str], results: List[Dict[str, Any]], version: int):
+        """Store search results, evicting the least recently used entry when full
+        
+        version is _search_cache_version from before the search ran; if the cache has been
+        cleared since, the results may predate a write and are not stored.
+        """
+        with self._search_cache_lock:
+            if version != self._search_cache_version:
+                return
+            self._search_cache[key] = (time.monotonic(), self._copy_hits(results))
+            self._search_cache.move_to_end(key)
+            if len(self._search_cache) > self.search_cache_size:
+                self._search_cache.popitem(last=False)
+    
+    @staticmethod
+    def _copy_hits(hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Copy search hits so callers and the cache never share result or metadata dicts"""
+        return [{**hit, 'metadata': dict(hit['metadata'])} for hit in hits]
+    
+    def clear_search_cache(self):
+        """Drop all cached search results and invalidate searches still in flight"""
+        with self._search_cache_lock:
+            self._search_cache.clear()
+            self._search_cache_version += 1
+    
+    def get_cache_stats(self) -> Dict[str, int]:
+        """Get search result cache hit/miss counts and size"""
+        with self._search_cache_lock:
+            return {
+                'hits': self._search_cache_hits,
+                'misses': self._search_cache_misses,
+                'size': len(self._search_cache)
+            }
+    
     def _initialize_client(self):
         """Initialize ChromaDB client and collection"""
+        self.clear_search_cache()
         try:
             # Create directory if it doesn't exist
             os.makedirs(self.persist_directory, exist_ok=True)
@@ -34,32 +266,89 @@ class VectorStore:
                     allow_reset=True
                 )
             )
+            self._tune_sqlite()
+            self._ensure_metadata_index()
             
-            # Get or create collection
-            try:
-                self.collection = self.client.get_collection(name=COLLECTION_NAME)
-                logger.info(f"Loaded existing collection: {COLLECTION_NAME}")
-            except ValueError:
-                # Collection doesn't exist, create it
-                self.collection = self.client.create_collection(
-                    name=COLLECTION_NAME,
-                    metadata={"description": "Pakistani Law Documents"}
-                )
-                logger.info(f"Created new collection: {COLLECTION_NAME}")
+            # Get or create one collection per shard
+            collections = []
+            for name in self._shard_names():
+                try:
+                    collections.append(self.client.get_collection(name=name))
+                    logger.info(f"Loaded existing collection: {name}")
+                except ValueError:
+                    # Collection doesn't exist, create it
+                    collections.append(self.client.create_collection(
+                        name=name,
+                        metadata=_COLLECTION_METADATA
+                    ))
+                    logger.info(f"Created new collection: {name}")
+            self.collections = collections
+            
+            self._map_shards(self._warm_index)
             
         except Exception as e:
             logger.error(f"Failed to initialize ChromaDB: {e}")
             raise
     
-    def add_documents(self, chunks: List[Dict[str, str]], embeddings: List[List[float]]):
-        """Add document chunks with embeddings to the vector store"""
+    @staticmethod
+    def _warm_index(collection):
+        """Run a throwaway query so ChromaDB loads the HNSW index before the first real search"""
+        try:
+            # Query with a stored vector, since the embedding dimension isn't known up front
+            sample = collection.get(limit=1, include=['embeddings'])
+            if sample['ids']:
+                collection.query(query_embeddings=sample['embeddings'], n_results=1, include=[])
+        except Exception as e:
+            logger.warning(f"Failed to warm index for {collection.name}: {e}")
+    
+    def add_documents(self, chunks: List[Dict[str, str]], embeddings: Union[np.ndarray, List[List[float]]],
+                      batch_size: int = CHROMA_ADD_BATCH_SIZE):
+        """Add document chunks with embeddings to the vector store in batches of batch_size
+        
+        A C-contiguous float32 array (what GeminiIntegration.generate_embeddings returns) is
+        used as is; anything else is converted to one once.
+        """
         try:
+            embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+            # Never exceed the largest batch the ChromaDB backend accepts
+            batch_size = max(1, min(batch_size, self.client.max_batch_size))
+            
+            with self._write_lock:
+                self._tune_sqlite()
+                # Results cached before this write could miss the new documents
+                self.clear_search_cache()
+                try:
+                    if self.num_shards == 1:
+                        self._add_to_collection(self.collections[0], chunks, embeddings, batch_size)
+                        return
+                    
+                    shards = np.fromiter((self._shard_for(chunk['id']) for chunk in chunks), dtype=np.intp, count=len(chunks))
+                    for shard, collection in enumerate(self.collections):
+                        positions = np.flatnonzero(shards == shard)
+                        if len(positions):
+                            self._add_to_collection(collection, [chunks[i] for i in positions], embeddings[positions], batch_size)
+                finally:
+                    # Searches that ran during the write may have seen part of it
+                    self.clear_search_cache()
+            
+        except Exception as e:
+            logger.error(f"Failed to add documents to vector store: {e}")
+            raise
+    
+    @staticmethod
+    def _add_to_collection(collection, chunks: List[Dict[str, str]], embeddings: np.ndarray, batch_size: int):
+        """Add chunks to one shard collection in batches of batch_size"""
+        for start in range(0, len(chunks), batch_size):
+            batch = chunks[start:start + batch_size]
+            # ChromaDB validates embeddings as a list of lists; convert one batch at a time
+            batch_embeddings = embeddings[start:start + batch_size].tolist()
+            
             # Prepare data for ChromaDB
-            ids = [chunk['id'] for chunk in chunks]
-            documents = [chunk['content'] for chunk in chunks]
+            ids = [chunk['id'] for chunk in batch]
+            documents = [chunk['content'] for chunk in batch]
             metadatas = []
             
-            for chunk in chunks:
+            for chunk in batch:
                 metadata = {
                     'section_number': chunk['section_number'],
                     'title': chunk['title'],
@@ -67,83 +356,169 @@ class VectorStore:
                     'chunk_index': chunk['chunk_index'],
                     'total_chunks': chunk['total_chunks'],
                     'keywords': ', '.join(chunk.get('keywords', [])),
-                    'summary': chunk.get('summary', ''),
                     'legal_context': chunk.get('legal_context', 'general_legal')
                 }
                 metadatas.append(metadata)
             
             # Add to collection
-            self.collection.add(
+            collection.add(
                 ids=ids,
                 documents=documents,
-                embeddings=embeddings,
+                embeddings=batch_embeddings,
                 metadatas=metadatas
             )
             
-            logger.info(f"Added {len(chunks)} documents to vector store")
-            
-        except Exception as e:
-            logger.error(f"Failed to add documents to vector store: {e}")
-            raise
+            logger.info(f"Added {min(start + batch_size, len(chunks))}/{len(chunks)} documents to {collection.name}")
+    
+    def add_documents_async(self, chunks: List[Dict[str, str]], embeddings: Union[np.ndarray, List[List[float]]]):
+        """Queue chunks to be added by a background writer thread and return immediately
+        
+        Writes are applied in the order they were queued. The call blocks only when
+        CHROMA_WRITE_QUEUE_SIZE writes are already pending. Call flush() to wait for them
+        and to surface any write error. Once a queued write has failed, further calls raise
+        that error until flush() reports it.
+        """
+        if self._write_error is not None:
+            raise self._write_error
+        with self._writer_lock:
+            if self._writer_thread is None:
+                self._writer_thread = threading.Thread(target=self._write_worker, daemon=True)
+                self._writer_thread.start()
+        self._write_queue.put((chunks, embeddings))
+    
+    def _write_worker(self):
+        """Drain the write queue, remembering the first failure for flush() to raise"""
+        while True:
+            chunks, embeddings = self._write_queue.get()
+            try:
+                if self._write_error is None:
+                    self.add_documents(chunks, embeddings)
+                else:
+                    logger.error(f"Skipping queued write of {len(chunks)} chunks after an earlier write failed: "
+                                 f"{self._write_error}")
+            except Exception as e:
+                self._write_error = e
+            finally:
+                self._write_queue.task_done()
+    
+    def flush(self):
+        """Wait until every queued add_documents_async write is applied"""
+        self._write_queue.join()
+        if self._write_error is not None:
+            error, self._write_error = self._write_error, None
+            raise error
     
-    def search_similar(self, query_embedding: List[float], n_results: int = 5, 
+    def search_similar(self, query_embedding: Union[np.ndarray, List[float]], n_results: int = 5, 
                       filter_metadata: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
-        """Search for similar documents using vector similarity"""
+        """Search for similar documents using vector similarity, serving repeats from the result cache"""
+        query_vector = np.asarray(query_embedding, dtype=np.float32)
+        cache_key = self._search_cache_key(query_vector, n_results, filter_metadata)
+        cached = self._get_cached_search(cache_key)
+        if cached is not None:
+            return cached
+        cache_version = self._search_cache_version
+        
         try:
             # Prepare where clause for filtering
-            where_clause = None
-            if filter_metadata:
-                where_clause = filter_metadata
+            where_clause, post_filter = self._plan_filter(filter_metadata)
             
             # Perform similarity search
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=n_results,
-                where=where_clause,
-                include=['documents', 'metadatas', 'distances']
-            )
-            
-            # Format results
-            formatted_results = []
-            for i in range(len(results['ids'][0])):
-                result = {
-                    'id': results['ids'][0][i],
-                    'content': results['documents'][0][i],
-                    'metadata': results['metadatas'][0][i],
-                    'similarity_score': 1 - results['distances'][0][i]  # Convert distance to similarity
-                }
-                formatted_results.append(result)
+            shard_hits = self._query_shards([query_vector.tolist()], self._query_size(n_results, post_filter), where_clause)
             
+            formatted_results = self._apply_post_filter(shard_hits[0], post_filter, n_results)
+            self._cache_search(cache_key, formatted_results, cache_version)
             return formatted_results
             
         except Exception as e:
             logger.error(f"Failed to search vector store: {e}")
             return []
     
+    def search_similar_batch(self, query_embeddings: Union[np.ndarray, List[List[float]]], n_results: int = 5,
+                             filter_metadata: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """Search for several query embeddings at once, returning one result list per query
+        
+        Cached queries are answered from the result cache; the rest go to ChromaDB in a single
+        query call, which searches the index for all of them together.
+        """
+        query_vectors = np.asarray(query_embeddings, dtype=np.float32)
+        batch_results: List[Optional[List[Dict[str, Any]]]] = []
+        missing = []
+        for i, query_vector in enumerate(query_vectors):
+            cache_key = self._search_cache_key(query_vector, n_results, filter_metadata)
+            cached = self._get_cached_search(cache_key)
+            batch_results.append(cached)
+            if cached is None:
+                missing.append((i, cache_key))
+        
+        if missing:
+            cache_version = self._search_cache_version
+            try:
+                where_clause, post_filter = self._plan_filter(filter_metadata)
+                shard_hits = self._query_shards(query_vectors[[i for i, _ in missing]].tolist(),
+                                                self._query_size(n_results, post_filter), where_clause)
+                for row, (i, cache_key) in enumerate(missing):
+                    formatted_results = self._apply_post_filter(shard_hits[row], post_filter, n_results)
+                    self._cache_search(cache_key, formatted_results, cache_version)
+                    batch_results[i] = formatted_results
+            except Exception as e:
+                logger.error(f"Failed to search vector store: {e}")
+                for i, _ in missing:
+                    batch_results[i] = []
+        
+        return batch_results
+    
+    def _query_shards(self, query_embeddings: List[List[float]], n_results: int,
+                      where: Optional[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Query every shard and merge each query's hits into the overall top n_results"""
+        def query(collection):
+            return collection.query(
+                query_embeddings=query_embeddings,
+                n_results=n_results,
+                where=where,
+                include=['documents', 'metadatas', 'distances']
+            )
+        
+        shard_results = self._map_shards(query)
+        if len(shard_results) == 1:
+            return [self._format_query_results(shard_results[0], row) for row in range(len(query_embeddings))]
+        return [
+            heapq.nlargest(n_results, chain.from_iterable(self._format_query_results(results, row) for results in shard_results),
+                           key=itemgetter('similarity_score'))
+            for row in range(len(query_embeddings))
+        ]
+    
+    @staticmethod
+    def _format_query_results(results: Dict[str, Any], row: int) -> List[Dict[str, Any]]:
+        """Format one query's hits from a collection.query response"""
+        # Convert distance to similarity for all hits at once
+        similarities = (1.0 - np.asarray(results['distances'][row], dtype=np.float64)).tolist()
+        return [
+            {'id': doc_id, 'content': content, 'metadata': metadata, 'similarity_score': similarity}
+            for doc_id, content, metadata, similarity in zip(
+                results['ids'][row], results['documents'][row], results['metadatas'][row], similarities
+            )
+        ]
+    
     def search_by_section(self, section_number: str, document_type: str = None) -> List[Dict[str, Any]]:
         """Search for specific section by number"""
         try:
-            where_clause = {'section_number': section_number}
+            filter_metadata = {'section_number': section_number}
             if document_type:
-                where_clause['document_type'] = document_type
+                filter_metadata['document_type'] = document_type
+            where_clause, _ = self._plan_filter(filter_metadata)
             
-            results = self.collection.query(
-                query_texts=[""],  # Empty query since we're filtering by metadata
-                n_results=10,
+            # Pure metadata lookup: get() reads SQLite directly without embedding or ANN search
+            shard_results = self._map_shards(lambda collection: collection.get(
                 where=where_clause,
+                limit=10,
                 include=['documents', 'metadatas']
-            )
-            
-            formatted_results = []
-            for i in range(len(results['ids'][0])):
-                result = {
-                    'id': results['ids'][0][i],
-                    'content': results['documents'][0][i],
-                    'metadata': results['metadatas'][0][i]
-                }
-                formatted_results.append(result)
+            ))
             
-            return formatted_results
+            return [
+                {'id': doc_id, 'content': content, 'metadata': metadata}
+                for results in shard_results
+                for doc_id, content, metadata in zip(results['ids'], results['documents'], results['metadatas'])
+            ][:10]
             
         except Exception as e:
             logger.error(f"Failed to search by section: {e}")
@@ -152,10 +527,11 @@ class VectorStore:
     def get_collection_stats(self) -> Dict[str, Any]:
         """Get statistics about the collection"""
         try:
-            count = self.collection.count()
+            count = sum(self._map_shards(lambda collection: collection.count()))
             return {
                 'total_documents': count,
                 'collection_name': COLLECTION_NAME,
+                'shards': self.num_shards,
                 'persist_directory': self.persist_directory
             }
         except Exception as e:
@@ -165,7 +541,10 @@ class VectorStore:
     def delete_collection(self):
         """Delete the entire collection (use with caution)"""
         try:
-            self.client.delete_collection(name=COLLECTION_NAME)
+            with self._write_lock:
+                for name in self._shard_names():
+                    self.client.delete_collection(name=name)
+                self.clear_search_cache()
             logger.info(f"Deleted collection: {COLLECTION_NAME}")
         except Exception as e:
             logger.error(f"Failed to delete collection: {e}")
@@ -175,6 +554,8 @@ class VectorStore:
         try:
             self.delete_collection()
             self._initialize_client()
+            # Searches that ran while the collections were recreated may have cached nothing useful
+            self.clear_search_cache()
             logger.info("Collection reset successfully")
         except Exception as e:
             logger.error(f"Failed to reset collection: {e}")